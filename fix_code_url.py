@@ -1,65 +1,114 @@
 import yaml
 import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
-def fix_code_url(file_path):
+from fix_submission import write_if_changed
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+# Top-level `code_url: <value>` line, optionally quoted, with no trailing comment
+_CODE_URL_RE = re.compile(rb'^code_url:[ \t]*([\'"]?)([^\s\'"]*)\1[ \t\r]*$', re.MULTILINE)
+
+def fix_code_url(file_path, verbose=False, log=print):
     """
     Fix code_url for files where it's empty or NOT_SPECIFIED
+    
+    Messages go through log; "already valid" notices only when verbose.
     """
     try:
+        raw = Path(file_path).read_bytes()
+        
+        # Fast path: a URL already on the code_url line needs no YAML round-trip.
+        # A plain substring scan catches the common unquoted form; the regex
+        # only runs when the key is present but written some other way.
+        if raw.startswith(b'code_url: http') or b'\ncode_url: http' in raw:
+            already_valid = True
+        elif b'code_url:' in raw:
+            match = _CODE_URL_RE.search(raw)
+            already_valid = bool(match and b'://' in match.group(2))
+        else:
+            already_valid = False
+        if already_valid:
+            if verbose:
+                log(f"ℹ️  code_url already valid in {file_path}")
+            return False
+        
         # Load YAML file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+        data = yaml.load(raw, Loader=SafeLoader)
         
         # Check and fix code_url
         code_url = data.get('code_url', '')
         if not code_url or code_url == 'NOT_SPECIFIED' or code_url.strip() == '':
             data['code_url'] = 'http://www.quantum-espresso.org/download'
-            print(f"✅ Fixed code_url in {file_path}")
+            log(f"✅ Fixed code_url in {file_path}")
             
             # Write back to file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                yaml.dump(data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            content = yaml.dump(data, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True,
+                                sort_keys=False, encoding='utf-8')
+            write_if_changed(file_path, content, raw)
             return True
         else:
-            print(f"ℹ️  code_url already valid in {file_path}")
+            if verbose:
+                log(f"ℹ️  code_url already valid in {file_path}")
             return False
             
     except Exception as e:
-        print(f"❌ Error processing {file_path}: {e}")
+        log(f"❌ Error processing {file_path}: {e}")
         return False
 
-def batch_fix_code_urls(directory):
+def _fix_code_url_job(file_path, verbose):
+    """
+    Process pool entry point: fix one file and return its messages with the result
+    """
+    lines = []
+    fixed = fix_code_url(file_path, verbose, lines.append)
+    return fixed, lines
+
+def batch_fix_code_urls(directory, verbose=False):
     """
     Fix code_url in all YAML files in directory
     """
-    path = Path(directory)
-    yaml_files = list(path.glob("*.yaml")) + list(path.glob("*.yml"))
+    with os.scandir(directory) as it:
+        yaml_files = [entry.path for entry in it
+                      if entry.is_file(follow_symlinks=False) and entry.name.endswith(('.yaml', '.yml'))]
     
     if not yaml_files:
         print(f"No YAML files found in {directory}")
         return
     
-    fixed_count = 0
-    for file_path in yaml_files:
-        if fix_code_url(file_path):
-            fixed_count += 1
+    # Files are independent, so parse/dump them in parallel across processes
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(_fix_code_url_job, yaml_files, repeat(verbose), chunksize=8))
+    
+    # Emit the collected per-file messages in one write, in directory order
+    lines = [line for _, file_lines in results for line in file_lines]
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+    fixed_count = sum(fixed for fixed, _ in results)
     
     print(f"\n📊 Fixed {fixed_count} out of {len(yaml_files)} files")
 
 # Usage
 if __name__ == "__main__":
-    import sys
+    import argparse
     
-    if len(sys.argv) > 1:
-        # Fix specific file or directory
-        target = sys.argv[1]
-        if os.path.isfile(target):
-            fix_code_url(target)
-        elif os.path.isdir(target):
-            batch_fix_code_urls(target)
-        else:
-            print(f"❌ {target} is not a valid file or directory")
+    parser = argparse.ArgumentParser(description='Fix empty or NOT_SPECIFIED code_url fields')
+    parser.add_argument('target', nargs='?', default='submissions/', help='File or directory (default: submissions/)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Also report files that are already valid')
+    
+    args = parser.parse_args()
+    
+    # Fix specific file or directory
+    if os.path.isfile(args.target):
+        fix_code_url(args.target, args.verbose)
+    elif os.path.isdir(args.target):
+        batch_fix_code_urls(args.target, args.verbose)
     else:
-        # Default to submissions directory
-        batch_fix_code_urls("submissions/")
\ No newline at end of file
+        print(f"❌ {args.target} is not a valid file or directory")
\ No newline at end of file
@@ -1,102 +1,233 @@
 import yaml
-import json
+import io
 import os
-import re
+import shutil
+import string
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
-def fix_submission_file(input_file, output_file=None):
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_URL_FIELDS = ('paper_pdf', 'code_url', 'data_url')
+
+class _FilenameTable(dict):
+    """
+    str.translate table that keeps letters, numbers, underscores, hyphens
+    and dots and maps every other character to '_'
+    """
+    def __missing__(self, code):
+        return '_'
+
+_FILENAME_TABLE = _FilenameTable((ord(c), ord(c)) for c in string.ascii_letters + string.digits + '_.-')
+
+def _clean_instruction(s):
+    """
+    Strip whitespace, a leading "<digits>." step number and trailing periods
+    in a single pass, returning one slice of the original string
+    """
+    i, j = 0, len(s)
+    while i < j and s[i].isspace():
+        i += 1
+    while j > i and s[j - 1].isspace():
+        j -= 1
+    # Leading step number such as "1. "
+    k = i
+    while k < j and s[k].isdecimal():
+        k += 1
+    if k > i and k < j and s[k] == '.':
+        i = k + 1
+        while i < j and s[i].isspace():
+            i += 1
+    while j > i and s[j - 1] == '.':
+        j -= 1
+    return s[i:j]
+
+def _is_clean_instruction(inst):
+    """
+    Conservative check that _clean_instruction would return inst unchanged
+    """
+    return (isinstance(inst, str) and inst != ''
+            and not inst[0].isspace() and not inst[0].isdigit()
+            and not inst[-1].isspace() and inst[-1] != '.')
+
+def _build_claim(claim):
+    """
+    Return claim as a {'claim', 'instruction'} dict with cleaned instructions
+    """
+    claim_get = claim.get
+    instructions = claim_get('instruction', [])
+    
+    # Already-conforming instructions skip the cleanup scan. Copy the list
+    # rather than share it, so YAML aliases in the source are not re-emitted
+    if isinstance(instructions, list) and all(map(_is_clean_instruction, instructions)):
+        cleaned_instructions = list(instructions)
+    else:
+        # Fix instruction format
+        if isinstance(instructions, str):
+            # Convert string to list
+            instructions = [instructions]
+        
+        # Clean up instructions - remove numbering and trailing periods, drop empty steps
+        cleaned_instructions = [
+            cleaned
+            for cleaned in (_clean_instruction(inst) if isinstance(inst, str) else str(inst) for inst in instructions)
+            if cleaned
+        ]
+    
+    return {
+        'claim': claim_get('claim', ''),
+        'instruction': cleaned_instructions
+    }
+
+def _load_json(raw):
+    """
+    Parse JSON bytes, using orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    import json
+    return json.loads(raw)
+
+def _dump_yaml(data):
+    """
+    Serialize data into an in-memory buffer and return the UTF-8 bytes,
+    so the file itself is written with a single call
+    """
+    buf = io.BytesIO()
+    yaml.dump(data, buf, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True,
+              sort_keys=False, encoding='utf-8')
+    return buf.getvalue()
+
+def write_if_changed(path, content, old_content=None):
+    """
+    Atomically replace path with content unless it already holds those bytes
+    
+    Symlinks are written through to their target, and the target's permission
+    bits are kept (new files get the usual umask-derived mode).
+    """
+    if old_content is None and os.path.exists(path):
+        old_content = Path(path).read_bytes()
+    if content == old_content:
+        return False
+    
+    # Write a unique sibling temp file and swap it in so a crash never leaves a partial file
+    path = os.path.realpath(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return True
+
+def fix_submission_file(input_file, output_file=None, verbose=False, log=print):
     """
     Fix submission file to meet validation requirements
+    
+    Messages go through log; "already conforms" notices only when verbose.
     """
     if output_file is None:
         output_file = input_file
     
     try:
-        # Load the file (try YAML first, then JSON)
-        with open(input_file, 'r', encoding='utf-8') as f:
+        # Load the file with the parser its extension implies
+        input_path = Path(input_file)
+        file_ext = input_path.suffix.lower()
+        raw = input_path.read_bytes()
+        if file_ext == '.json':
+            try:
+                data = _load_json(raw)
+            except ValueError:
+                # Files fixed in place are written back as YAML under their .json name
+                data = yaml.load(raw, Loader=SafeLoader)
+        elif file_ext in ('.yaml', '.yml'):
+            data = yaml.load(raw, Loader=SafeLoader)
+        else:
+            # Unknown extension: try YAML first, then JSON
             try:
-                data = yaml.safe_load(f)
+                data = yaml.load(raw, Loader=SafeLoader)
             except yaml.YAMLError:
-                f.seek(0)
-                data = json.load(f)
+                data = _load_json(raw)
         
         # Fix required fields
+        get = data.get
         fixed_data = {
-            'username': data.get('username', ''),
-            'paper_title': data.get('paper_title', ''),
-            'paper_pdf': data.get('paper_pdf', ''),
-            'identifier': data.get('identifier', ''),
+            'username': get('username', ''),
+            'paper_title': get('paper_title', ''),
+            'paper_pdf': get('paper_pdf', ''),
+            'identifier': get('identifier', ''),
             'claim_type': 'custom_code',  # Add required claim_type field
-            'code_url': data.get('code_url', 'NOT_SPECIFIED'),
-            'data_url': data.get('data_url', 'NOT_SPECIFIED'),  # Optional but keep if present
-            'claims': [],
-            'non_reproducible_claims': data.get('non_reproducible_claims', [])
+            'code_url': get('code_url', 'NOT_SPECIFIED'),
+            'data_url': get('data_url', 'NOT_SPECIFIED'),  # Optional but keep if present
+            'claims': [_build_claim(claim) for claim in get('claims') or []],
+            'non_reproducible_claims': get('non_reproducible_claims', [])
         }
         
-        # Fix claims
-        if 'claims' in data and data['claims']:
-            for claim in data['claims']:
-                fixed_claim = {
-                    'claim': claim.get('claim', ''),
-                    'instruction': []
-                }
-                
-                # Fix instruction format
-                instructions = claim.get('instruction', [])
-                if isinstance(instructions, str):
-                    # Convert string to list
-                    instructions = [instructions]
-                
-                # Clean up instructions - remove numbering and fix format
-                cleaned_instructions = []
-                for inst in instructions:
-                    if isinstance(inst, str):
-                        # Remove leading numbers and dots
-                        cleaned = re.sub(r'^\s*\d+\.\s*', '', inst.strip())
-                        # Remove trailing periods
-                        cleaned = cleaned.rstrip('.')
-                        if cleaned:
-                            cleaned_instructions.append(cleaned)
-                    else:
-                        cleaned_instructions.append(str(inst))
-                
-                fixed_claim['instruction'] = cleaned_instructions
-                fixed_data['claims'].append(fixed_claim)
-        
         # Validate URLs
-        url_fields = ['paper_pdf', 'code_url', 'data_url']
-        for field in url_fields:
+        for field in _URL_FIELDS:
             if field in fixed_data and fixed_data[field]:
                 url = fixed_data[field]
-                if url != 'NOT_SPECIFIED' and not (url.startswith('http://') or url.startswith('https://')):
-                    print(f"Warning: {field} URL doesn't start with http:// or https://")
-        
-        # Write fixed file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(fixed_data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+                if url != 'NOT_SPECIFIED' and not url.startswith(('http://', 'https://')):
+                    log(f"Warning: {field} URL doesn't start with http:// or https://")
         
-        print(f"✅ Successfully fixed {input_file}")
+        # Write fixed file, skipping the write when it would not change anything
+        content = _dump_yaml(fixed_data)
+        old_content = raw if str(output_file) == str(input_file) else None
+        if write_if_changed(output_file, content, old_content):
+            log(f"✅ Successfully fixed {input_file}")
+        elif verbose:
+            log(f"ℹ️  {input_file} already conforms, left unchanged")
         return True
         
     except Exception as e:
-        print(f"❌ Error fixing {input_file}: {str(e)}")
+        log(f"❌ Error fixing {input_file}: {str(e)}")
         return False
 
+def _fix_submission_job(paths, verbose):
+    """
+    Process pool entry point: fix an (input_file, output_file) pair and
+    return its messages with the result
+    """
+    input_file, output_file = paths
+    lines = []
+    success = fix_submission_file(input_file, output_file, verbose, lines.append)
+    return success, lines
+
 def validate_filename(filename):
     """
     Validate filename contains only allowed characters
     """
     # Remove directory path for validation
     basename = os.path.basename(filename)
-    # Check if filename contains only letters, numbers, underscores, hyphens, and dots
-    if re.match(r'^[a-zA-Z0-9_.-]+$', basename):
+    # Replace anything but letters, numbers, underscores, hyphens, and dots
+    fixed_name = basename.translate(_FILENAME_TABLE)
+    if basename and fixed_name == basename:
         return True, basename
     else:
         # Suggest a fixed filename
-        fixed_name = re.sub(r'[^a-zA-Z0-9_.-]', '_', basename)
         return False, fixed_name
 
-def batch_fix_submissions(input_directory, output_directory=None):
+def batch_fix_submissions(input_directory, output_directory=None, verbose=False):
     """
     Batch fix all submission files in a directory
     """
@@ -109,88 +240,71 @@ def batch_fix_submissions(input_directory, output_directory=None):
         output_path = input_path
     
     # Find all YAML and JSON files
-    submission_files = list(input_path.glob("*.yaml")) + list(input_path.glob("*.yml")) + list(input_path.glob("*.json"))
+    with os.scandir(input_directory) as it:
+        entries = [entry for entry in it
+                   if entry.is_file(follow_symlinks=False) and entry.name.endswith(('.yaml', '.yml', '.json'))]
+    # Smallest first keeps the working set warm and evens out pool task sizes
+    entries.sort(key=lambda entry: entry.stat(follow_symlinks=False).st_size)
+    submission_files = [entry.path for entry in entries]
     
     if not submission_files:
         print(f"No submission files found in {input_directory}")
         return
     
-    successful = 0
-    failed = 0
-    
+    jobs = []
+    rename_notices = {}
     for file_path in submission_files:
+        file_name = os.path.basename(file_path)
         # Validate and fix filename if needed
-        is_valid, suggested_name = validate_filename(file_path.name)
+        is_valid, suggested_name = validate_filename(file_name)
         
         if output_directory:
             if is_valid:
-                output_file = output_path / file_path.name
+                output_file = output_path / file_name
             else:
                 output_file = output_path / suggested_name
-                print(f"📝 Renaming {file_path.name} to {suggested_name}")
+                rename_notices[file_path] = f"📝 Renaming {file_name} to {suggested_name}"
         else:
             if not is_valid:
-                new_path = file_path.parent / suggested_name
-                print(f"📝 Will rename {file_path.name} to {suggested_name}")
+                new_path = os.path.join(os.path.dirname(file_path), suggested_name)
+                rename_notices[file_path] = f"📝 Will rename {file_name} to {suggested_name}"
                 output_file = new_path
             else:
                 output_file = file_path
         
-        if fix_submission_file(file_path, output_file):
-            successful += 1
-        else:
-            failed += 1
+        jobs.append((file_path, str(output_file)))
+    
+    # Renames or a shared --output directory can map several inputs to one file.
+    # Those run serially in the parent, in order, so the last one wins as before
+    target_counts = Counter(os.path.realpath(output_file) for _, output_file in jobs)
+    parallel_jobs = [job for job in jobs if target_counts[os.path.realpath(job[1])] == 1]
+    serial_jobs = [job for job in jobs if target_counts[os.path.realpath(job[1])] > 1]
+    
+    # The remaining files are independent, so parse/dump them in parallel across
+    # processes, handing each worker a few chunks to keep IPC round-trips down
+    chunksize = max(1, len(parallel_jobs) // (4 * (os.cpu_count() or 1)))
+    with ProcessPoolExecutor() as executor:
+        parallel_results = executor.map(_fix_submission_job, parallel_jobs, repeat(verbose), chunksize=chunksize)
+        job_results = {job: _fix_submission_job(job, verbose) for job in serial_jobs}
+        job_results.update(zip(parallel_jobs, parallel_results))
+    results = [job_results[job] for job in jobs]
+    
+    # Emit the collected messages in one write, grouped per file (rename notice
+    # first) and in processing order
+    lines = []
+    for (file_path, _), (_, file_lines) in zip(jobs, results):
+        if file_path in rename_notices:
+            lines.append(rename_notices[file_path])
+        lines.extend(file_lines)
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+    successful = sum(success for success, _ in results)
+    failed = len(results) - successful
     
     print(f"\n📊 Batch processing complete:")
     print(f"✅ Successfully processed: {successful} files")
     print(f"❌ Failed: {failed} files")
 
-def create_workflow_safe_script():
-    """
-    Create a shell script snippet that handles filenames safely
-    """
-    script_content = '''#!/bin/bash
-
-# Safe way to handle file lists in GitHub Actions workflow
-# This should replace problematic sections in .github/workflows/validate-pr.yml
-
-# Get list of changed files safely
-mapfile -t changed_files < <(git diff --name-only --diff-filter=A HEAD~1 HEAD | grep "^submissions/")
-
-if [ ${#changed_files[@]} -eq 0 ]; then
-    echo "❌ No submission files found in this PR"
-    exit 1
-fi
-
-echo "📁 Found ${#changed_files[@]} submission files:"
-for file in "${changed_files[@]}"; do
-    echo "  - $file"
-done
-
-# Validate each file
-for file in "${changed_files[@]}"; do
-    if [ -f "$file" ]; then
-        echo "🔍 Validating: $file"
-        python scripts/validate_submission.py "$file"
-        if [ $? -ne 0 ]; then
-            echo "❌ Validation failed for: $file"
-            exit 1
-        fi
-    else
-        echo "❌ File not found: $file"
-        exit 1
-    fi
-done
-
-echo "✅ All submission files validated successfully"
-'''
-    
-    with open('fix_workflow.sh', 'w') as f:
-        f.write(script_content)
-    
-    os.chmod('fix_workflow.sh', 0o755)
-    print("📝 Created fix_workflow.sh - use this to replace problematic workflow sections")
-
 # Main execution
 if __name__ == "__main__":
     import argparse
@@ -200,12 +314,15 @@ if __name__ == "__main__":
     parser.add_argument('--output', '-o', help='Output directory (optional)')
     parser.add_argument('--single', '-s', help='Fix single file')
     parser.add_argument('--create-workflow-fix', action='store_true', help='Create workflow fix script')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Also report files that already conform')
     
     args = parser.parse_args()
     
     if args.create_workflow_fix:
+        # Rarely used, so the script template is only imported on request
+        from fix_submission_workflow import create_workflow_safe_script
         create_workflow_safe_script()
     elif args.single:
-        fix_submission_file(args.single)
+        fix_submission_file(args.single, verbose=args.verbose)
     else:
-        batch_fix_submissions(args.input, args.output)
\ No newline at end of file
+        batch_fix_submissions(args.input, args.output, args.verbose)
\ No newline at end of file